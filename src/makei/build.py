@@ -1,18 +1,38 @@
 #!/usr/bin/env python3.9
 
 """ The module used to build a project"""
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tempfile import mkstemp
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from makei.const import BOB_PATH, MK_PATH
+from makei.const import BOB_PATH, MK_PATH, SCAN_SKIP_DIRS
 from makei.ibmi_json import IBMiJson
 from makei.iproj_json import IProjJson
 from makei.rules_mk import RulesMk
 from makei.utils import objlib_to_path, \
     run_command, support_color, print_to_stdout, Colors, colored
 
+# Markers printed for each object by logSuccess and logFail in def_rules.mk
+_FAILED_MARKER = b"Failed to create"
+_SUCCESS_MARKER = b"was created successfully!"
+
+
+def _render_rules_mk(rules_mk_path: Path, include_paths: Tuple[Path, ...], build_ctx: "BuildEnv") -> str:
+    """ Returns the content of the .Rules.mk.build generated from the given Rules.mk."""
+    rules_mk = RulesMk.from_file(rules_mk_path, build_ctx.src_dir, list(include_paths))
+    rules_mk.build_context = build_ctx
+    return str(rules_mk)
+
+
+def _write_rules_mk_build(rules_mk_path: Path, content: str) -> Path:
+    """ Writes the .Rules.mk.build next to the given Rules.mk and returns its path."""
+    rules_mk_build_path = rules_mk_path.parent / ".Rules.mk.build"
+    rules_mk_build_path.write_text(content)
+    return rules_mk_build_path
+
 
 class BuildEnv:
     """ The Build Environment used to build or compile a project. """
@@ -25,13 +45,14 @@ class BuildEnv:
     bob_path: Path
     bob_makefile: Path
     build_vars_path: Path
-    build_vars_handle: Path
     curlib: str
     pre_usr_libl: str
     post_usr_libl: str
     iproj_json_path: Path
     iproj_json: IProjJson
+    _include_paths: Tuple[Path, ...]
     ibmi_env_cmds: str
+    _enc: str
 
     tmp_files: List[Path] = []
 
@@ -47,11 +68,15 @@ class BuildEnv:
         self.bob_path = Path(
             overrides["bob_path"]) if "bob_path" in overrides else BOB_PATH
         self.bob_makefile = MK_PATH / 'Makefile'
-        self.build_vars_handle, path = mkstemp()
+        fd, path = mkstemp()
+        # The file is reopened by path when the build vars are written
+        os.close(fd)
         self.build_vars_path = Path(path)
         self.iproj_json_path = self.src_dir / "iproj.json"
         self.iproj_json = IProjJson.from_file(self.iproj_json_path)
+        self._include_paths = tuple(Path(p) for p in self.iproj_json.include_path)
         self.color = support_color()
+        self._enc = sys.getdefaultencoding()
 
         if len(self.iproj_json.set_ibm_i_env_cmd) > 0:
             cmd_list = self.iproj_json.set_ibm_i_env_cmd
@@ -62,10 +87,14 @@ class BuildEnv:
         self.success_targets = []
         self.failed_targets = []
 
-        self._create_build_vars()
+        rules_mk_paths, subdir_inodes = self._scan_tree()
+        self._create_build_vars(rules_mk_paths, subdir_inodes)
 
     def __del__(self):
-        self.build_vars_path.unlink()
+        try:
+            os.unlink(self.build_vars_path)
+        except FileNotFoundError:
+            pass
 
     def generate_make_cmd(self):
         """ Returns the make command used to build the project."""
@@ -76,59 +105,86 @@ class BuildEnv:
         cmd = f"{cmd} {' '.join(self.targets)}"
         return cmd
 
-    def _create_build_vars(self):
+    def _scan_tree(self) -> Tuple[List[Path], Dict[Path, int]]:
+        """ Walks the project once and returns the Rules.mk paths and the inode numbers of the directories
+        containing them, both keyed relative to the source directory."""
+        rules_mk_paths = []
+        subdir_inodes = {}
+        pending_dirs = [(Path("."), os.stat(self.src_dir).st_ino)]
+        while pending_dirs:
+            rel_dir, inode = pending_dirs.pop()
+            try:
+                entries = os.scandir(self.src_dir / rel_dir)
+            except PermissionError:
+                # Unreadable directories are skipped, as Path.rglob does
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SCAN_SKIP_DIRS:
+                            pending_dirs.append((rel_dir / entry.name, entry.inode()))
+                    elif entry.name == "Rules.mk":
+                        rules_mk_paths.append(rel_dir / entry.name)
+                        subdir_inodes[rel_dir] = inode
+        return rules_mk_paths, subdir_inodes
+
+    def _create_build_vars(self, rules_mk_paths: List[Path], subdir_inodes: Dict[Path, int]):
         target_file_path = self.build_vars_path
 
-        rules_mk_paths = list(Path(".").rglob("Rules.mk"))
+        # Parse every Rules.mk on this thread first, so an invalid one stops the build before any
+        # .Rules.mk.build is written and its messages are not interleaved with others
+        contents = [_render_rules_mk(rules_mk_path, self._include_paths, self) for rules_mk_path in rules_mk_paths]
         # Create Rules.mk.build for each Rules.mk
-        for rules_mk_path in rules_mk_paths:
-            rules_mk = RulesMk.from_file(rules_mk_path,  self.src_dir, map(Path, self.iproj_json.include_path))
-            rules_mk.build_context = self
-            rules_mk_build_path = rules_mk_path.parent / ".Rules.mk.build"
-            rules_mk_build_path.write_text(str(rules_mk))
-            self.tmp_files.append(rules_mk_build_path)
-
-        subdirs = list(map(lambda x: x.parents[0], rules_mk_paths))
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            self.tmp_files.extend(executor.map(_write_rules_mk_build, rules_mk_paths, contents))
 
-        subdirs.sort(key=lambda x: len(x.parts))
+        # Visit the directories in inode order, which tends to follow their placement on disk
+        subdirs = sorted(subdir_inodes, key=subdir_inodes.__getitem__)
         dir_var_map = {Path('.'): IBMiJson.from_values(self.iproj_json.tgt_ccsid, self.iproj_json.objlib)}
 
         def map_ibmi_json_var(path):
-            if path != Path("."):
-                dir_var_map[path] = IBMiJson.from_file(path / ".ibmi.json", dir_var_map[path.parents[0]])
+            # The parent values are resolved first since a .ibmi.json inherits what it does not override
+            if path not in dir_var_map:
+                dir_var_map[path] = IBMiJson.from_file(path / ".ibmi.json", map_ibmi_json_var(path.parent))
+            return dir_var_map[path]
 
-        list(map(map_ibmi_json_var, subdirs))
+        for subdir in subdirs:
+            map_ibmi_json_var(subdir)
 
         # set build env variables based on iproj.json
         # if not include_path specified just use INCDIR(*NONE)
         #  otherwise use INCDIR('dir1' 'dir2')
-        incdir = "*NONE"
+        incdir = double_incdir = "*NONE"
         include_path = self.iproj_json.include_path
         # if include path is not empty or *NONE then wrap in single quotes
-        if len(include_path) > 0 and [v.upper() for v in include_path] != ["*NONE"]:
-            incdir = '\'' + '\' \''.join(include_path) + '\''
+        if include_path and not (len(include_path) == 1 and include_path[0].upper() == "*NONE"):
+            incdir = " ".join(["'" + path + "'" for path in include_path])
+            # Quotes inside a path are doubled too
+            double_incdir = " ".join(["''" + path.replace("'", "''") + "''" for path in include_path])
         elif len(include_path) == 1:
-            incdir = include_path[0].upper()
+            incdir = double_incdir = include_path[0].upper()
+        header = "".join([
+            "# This file is generated by makei, DO NOT EDIT.\n",
+            "# Modify .ibmi.json to override values\n",
+            "\n",
+            f"curlib := {self.iproj_json.curlib}\n",
+            f"preUsrlibl := {' '.join(self.iproj_json.pre_usr_libl)}\n",
+            f"postUsrlibl := {' '.join(self.iproj_json.post_usr_libl)}\n",
+            f"INCDIR := {incdir}\n",
+            f"unquotedINCDIR := {' '.join(include_path)}\n",
+            f"doublequotedINCDIR := {double_incdir}\n",
+            f"IBMiEnvCmd := {self.ibmi_env_cmds}\n",
+            f"COLOR_TTY := {'true' if self.color else 'false'}\n",
+            "\n",
+        ])
+        lines = []
+        for subdir in subdirs:
+            abs_str = str(self.src_dir / subdir)
+            build = dir_var_map[subdir].build
+            lines.append(f"TGTCCSID_{abs_str} := {build['tgt_ccsid']}\n"
+                         f"OBJPATH_{abs_str} := {objlib_to_path(build['objlib'])}\n")
         with target_file_path.open("w", encoding="utf8") as file:
-            file.write(f"""# This file is generated by makei, DO NOT EDIT.
-# Modify .ibmi.json to override values
-
-curlib := {self.iproj_json.curlib}
-preUsrlibl := {' '.join(self.iproj_json.pre_usr_libl)}
-postUsrlibl := {' '.join(self.iproj_json.post_usr_libl)}
-INCDIR := {incdir}
-unquotedINCDIR := {' '.join(include_path)}
-doublequotedINCDIR := {incdir.replace("'", "''")}
-IBMiEnvCmd := {self.ibmi_env_cmds}
-COLOR_TTY := {'true' if self.color else 'false'}
-
-""")
-            for subdir in subdirs:
-                # print(dir_var_map[subdir].build)
-                file.write(
-                    f"TGTCCSID_{subdir.absolute()} := {dir_var_map[subdir].build['tgt_ccsid']}\n")
-                file.write(
-                    f"OBJPATH_{subdir.absolute()} := {objlib_to_path(dir_var_map[subdir].build['objlib'])}\n")
+            file.write(header + "".join(lines))
 
             # for rules_mk in rules_mks:
             #     with rules_mk.open('r') as rules_mk_file:
@@ -142,19 +198,16 @@ COLOR_TTY := {'true' if self.color else 'false'}
 
     def make(self):
         """ Generate and execute the make command."""
-        if (self.src_dir / ".logs" / "joblog.json").exists():
-            (self.src_dir / ".logs" / "joblog.json").unlink()
-        if (self.src_dir / ".logs" / "output.log").exists():
-            (self.src_dir / ".logs" / "output.log").unlink()
+        (self.src_dir / ".logs" / "joblog.json").unlink(missing_ok=True)
+        (self.src_dir / ".logs" / "output.log").unlink(missing_ok=True)
 
         def handle_make_output(line_bytes: bytes):
-            if isinstance(line_bytes, bytes):
-                line = line_bytes.decode(sys.getdefaultencoding())
-            if "Failed to create" in line:
-                self.failed_targets.append(line.split()[-1].split("!")[0])
-            if "was created successfully!" in line:
-                self.success_targets.append(line.split()[1])
-            print_to_stdout(line)
+            # Only decode the lines reporting an object status, the others are written out as is
+            if _FAILED_MARKER in line_bytes:
+                self.failed_targets.append(line_bytes.decode(self._enc).split()[-1].split("!")[0])
+            if _SUCCESS_MARKER in line_bytes:
+                self.success_targets.append(line_bytes.decode(self._enc).split()[1])
+            print_to_stdout(line_bytes)
 
         run_command(self.generate_make_cmd(), handle_make_output)
         self._post_make()
@@ -162,7 +215,10 @@ COLOR_TTY := {'true' if self.color else 'false'}
 
     def _post_make(self):
         for tmp_file in self.tmp_files:
-            tmp_file.unlink()
+            try:
+                os.unlink(tmp_file)
+            except FileNotFoundError:
+                pass
         print(colored("Objects:            ", Colors.BOLD), colored(f"{len(self.failed_targets)} failed", Colors.FAIL),
               colored(f"{len(self.success_targets)} succeed", Colors.OKGREEN),
               f"{len(self.success_targets) + len(self.failed_targets)} total")
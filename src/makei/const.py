@@ -8,6 +8,9 @@ DEFAULT_CURLIB = "*CRTDFT"
 BOB_PATH = Path(__file__).resolve().parent.parent.parent
 MK_PATH = BOB_PATH / "src" / "mk"
 
+# Directories that never contain a Rules.mk and are skipped when scanning the project
+SCAN_SKIP_DIRS = frozenset((".git", ".logs", ".evfevent"))
+
 METADATA_HEADER = "%METADATA"
 METADATA_FOOTER = "%EMETADATA"
 TEXT_HEADER = "%TEXT"
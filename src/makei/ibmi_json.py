@@ -31,28 +31,32 @@ class IBMiJson:
     def from_file(cls, file_path: Path, parent_ibm_i_json: "IBMiJson") -> "IBMiJson":
         if file_path.exists():
             with file_path.open() as file:
-                data = json.load(file)
-                if "version" in data:
-                    version = data["version"]
-                else:
-                    version = None
-                if "build" in data:
-                    build = data["build"]
-                    if "tgtCcsid" in build:
-                        tgt_ccsid = build["tgtCcsid"]
-                    else:
-                        tgt_ccsid = parent_ibm_i_json.build["tgt_ccsid"]
-                    # if tgt_ccsid is None:
-                    #     tgt_ccsid= "*JOB"
-                    if "objlib" in build:
-                        objlib = parse_all_variables(build["objlib"])
-                    else:
-                        objlib = parent_ibm_i_json.build["objlib"]
-
-                return IBMiJson(version, {"tgt_ccsid": tgt_ccsid, "objlib": objlib})
+                return IBMiJson.from_dict(json.load(file), parent_ibm_i_json)
         else:
             return parent_ibm_i_json.copy()
 
+    @classmethod
+    def from_dict(cls, data: Dict, parent_ibm_i_json: "IBMiJson") -> "IBMiJson":
+        """Creates an IBMiJson object from the loaded json data"""
+        if "version" in data:
+            version = data["version"]
+        else:
+            version = None
+        if "build" in data:
+            build = data["build"]
+            if "tgtCcsid" in build:
+                tgt_ccsid = build["tgtCcsid"]
+            else:
+                tgt_ccsid = parent_ibm_i_json.build["tgt_ccsid"]
+            # if tgt_ccsid is None:
+            #     tgt_ccsid= "*JOB"
+            if "objlib" in build:
+                objlib = parse_all_variables(build["objlib"])
+            else:
+                objlib = parent_ibm_i_json.build["objlib"]
+
+        return IBMiJson(version, {"tgt_ccsid": tgt_ccsid, "objlib": objlib})
+
     def __dict__(self):
         build = {}
 
@@ -59,50 +59,54 @@ class IProjJson:
     @classmethod
     def from_file(cls, file_path: Path) -> "IProjJson":
         """Creates an IBMiJson object from a file"""
+        try:
+            with file_path.open() as file:
+                return IProjJson.from_dict(json.load(file))
+        except FileNotFoundError:
+            print(colored("iproj.json not found!", Colors.FAIL))
+            sys.exit(1)
+
+    @classmethod
+    def from_dict(cls, iproj_json: Dict[str, "JsonType"]) -> "IProjJson":
+        """Creates an IProjJson object from the loaded json data"""
 
         def with_default_value(key, default_value, src_dict):
             if key in src_dict:
                 return src_dict[key]
             return default_value
 
-        try:
-            with file_path.open() as file:
-                iproj_json = json.load(file)
-                objlib = parse_all_variables(with_default_value(
-                    "objlib", DEFAULT_OBJLIB, iproj_json))
-                curlib = parse_all_variables(with_default_value(
-                    "curlib", DEFAULT_CURLIB, iproj_json))
-                if objlib == "*CURLIB":
-                    if curlib == "*CRTDFT":
-                        objlib = "QGPL"
-                    else:
-                        objlib = curlib
-
-                pre_usr_libl = list(map(parse_all_variables, with_default_value("preUsrlibl", [], iproj_json)))
-
-                post_usr_libl = list(map(parse_all_variables, with_default_value("postUsrlibl", [], iproj_json)))
-                include_path = list(map(parse_all_variables, with_default_value("includePath", [], iproj_json)))
-
-                tgt_ccsid = with_default_value("tgtCcsid", "*JOB", iproj_json)
-                set_ibm_i_env_cmd = list(map(parse_all_variables, with_default_value("setIBMiEnvCmd", [], iproj_json)))
-                extensions = with_default_value("extensions", {}, iproj_json)
-                return IProjJson(
-                    description=with_default_value("description", "", iproj_json),
-                    version=with_default_value("version", None, iproj_json),
-                    license=with_default_value("license", "", iproj_json),
-                    repository=with_default_value("repository", None, iproj_json),
-                    include_path=include_path,
-                    objlib=objlib,
-                    curlib=curlib,
-                    pre_usr_libl=pre_usr_libl,
-                    post_usr_libl=post_usr_libl,
-                    set_ibm_i_env_cmd=set_ibm_i_env_cmd,
-                    tgt_ccsid=tgt_ccsid,
-                    extensions=extensions
-                )
-        except FileNotFoundError:
-            print(colored("iproj.json not found!", Colors.FAIL))
-            sys.exit(1)
+        objlib = parse_all_variables(with_default_value(
+            "objlib", DEFAULT_OBJLIB, iproj_json))
+        curlib = parse_all_variables(with_default_value(
+            "curlib", DEFAULT_CURLIB, iproj_json))
+        if objlib == "*CURLIB":
+            if curlib == "*CRTDFT":
+                objlib = "QGPL"
+            else:
+                objlib = curlib
+
+        pre_usr_libl = list(map(parse_all_variables, with_default_value("preUsrlibl", [], iproj_json)))
+
+        post_usr_libl = list(map(parse_all_variables, with_default_value("postUsrlibl", [], iproj_json)))
+        include_path = list(map(parse_all_variables, with_default_value("includePath", [], iproj_json)))
+
+        tgt_ccsid = with_default_value("tgtCcsid", "*JOB", iproj_json)
+        set_ibm_i_env_cmd = list(map(parse_all_variables, with_default_value("setIBMiEnvCmd", [], iproj_json)))
+        extensions = with_default_value("extensions", {}, iproj_json)
+        return IProjJson(
+            description=with_default_value("description", "", iproj_json),
+            version=with_default_value("version", None, iproj_json),
+            license=with_default_value("license", "", iproj_json),
+            repository=with_default_value("repository", None, iproj_json),
+            include_path=include_path,
+            objlib=objlib,
+            curlib=curlib,
+            pre_usr_libl=pre_usr_libl,
+            post_usr_libl=post_usr_libl,
+            set_ibm_i_env_cmd=set_ibm_i_env_cmd,
+            tgt_ccsid=tgt_ccsid,
+            extensions=extensions
+        )
 
     def __dict__(self):
         return {
@@ -0,0 +1,98 @@
+import gc
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from makei.build import BuildEnv
+
+
+def _create_project(root):
+    (root / "iproj.json").write_text(json.dumps({"includePath": ["inc"]}))
+    (root / "Rules.mk").write_text("SUBDIRS = src\n")
+    (root / "inc").mkdir()
+    (root / "inc" / "cpy.rpgle").write_text("")
+    (root / "src").mkdir()
+    (root / "src" / "Rules.mk").write_text("SBSA.FILE: cpy.rpgle\n\tsystem -i \"CRTSBSD\"\n"
+                                           "SBSB.FILE: cpy.rpgle\n\tsystem -i \"CRTSBSD\"\n")
+
+
+def test_include_path_applied_to_every_rule(tmp_path, monkeypatch):
+    # Test every rule resolves dependencies against the include path
+    _create_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    build_env = BuildEnv()
+    rules_mk_build = (tmp_path / "src" / ".Rules.mk.build").read_text()
+    assert "SBSA.FILE : inc/cpy.rpgle cpy.rpgle" in rules_mk_build
+    assert "SBSB.FILE : inc/cpy.rpgle cpy.rpgle" in rules_mk_build
+    assert build_env.targets == ["all"]
+
+
+def test_ibmi_json_inherited_through_dir_without_rules_mk(tmp_path, monkeypatch):
+    # Test a directory without Rules.mk still passes its .ibmi.json values down
+    (tmp_path / "iproj.json").write_text(json.dumps({"objlib": "PROJLIB"}))
+    (tmp_path / "Rules.mk").write_text("SUBDIRS = nested\n")
+    (tmp_path / "nested" / "sub").mkdir(parents=True)
+    (tmp_path / "nested" / ".ibmi.json").write_text(json.dumps({"build": {"objlib": "NESTLIB", "tgtCcsid": "37"}}))
+    (tmp_path / "nested" / "sub" / "Rules.mk").write_text("SUBDIRS =\n")
+    monkeypatch.chdir(tmp_path)
+    build_env = BuildEnv()
+    build_vars = build_env.build_vars_path.read_text()
+    assert f"OBJPATH_{tmp_path} := /QSYS.LIB/PROJLIB.LIB\n" in build_vars
+    assert f"TGTCCSID_{tmp_path / 'nested' / 'sub'} := 37\n" in build_vars
+    assert f"OBJPATH_{tmp_path / 'nested' / 'sub'} := /QSYS.LIB/NESTLIB.LIB\n" in build_vars
+
+
+def test_source_member_text_change_picked_up(tmp_path, monkeypatch):
+    # Test a %TEXT change in a source file shows up in the next build in the same process
+    (tmp_path / "iproj.json").write_text("{}")
+    (tmp_path / "Rules.mk").write_text("HELLO.PGM: hello.rpgle\n")
+    source_path = tmp_path / "hello.rpgle"
+    source_path.write_text("**free\n// %METADATA\n// %TEXT Old text\n// %EMETADATA\n")
+    monkeypatch.chdir(tmp_path)
+    BuildEnv()
+    assert "HELLO.PGM: TEXT = Old text" in (tmp_path / ".Rules.mk.build").read_text()
+    source_path.write_text("**free\n// %METADATA\n// %TEXT New text\n// %EMETADATA\n")
+    BuildEnv()
+    assert "HELLO.PGM: TEXT = New text" in (tmp_path / ".Rules.mk.build").read_text()
+
+
+def test_build_vars_removed_when_build_env_collected(tmp_path, monkeypatch):
+    # Test nothing keeps a BuildEnv alive after a build so its build vars file is removed
+    _create_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    build_env = BuildEnv()
+    build_vars_path = build_env.build_vars_path
+    del build_env
+    gc.collect()
+    assert not build_vars_path.exists()
+
+
+def test_unreadable_dir_skipped(tmp_path, monkeypatch):
+    # Test a directory that cannot be listed is skipped instead of failing the build
+    _create_project(tmp_path)
+    (tmp_path / "locked").mkdir()
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if Path(path).name == "locked":
+            raise PermissionError(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    monkeypatch.chdir(tmp_path)
+    BuildEnv()
+    assert (tmp_path / "src" / ".Rules.mk.build").exists()
+
+
+def test_invalid_rules_mk_exits_before_writing(tmp_path, monkeypatch):
+    # Test an unsupported target exits with code 1 before any .Rules.mk.build is written
+    _create_project(tmp_path)
+    (tmp_path / "bad").mkdir()
+    (tmp_path / "bad" / "Rules.mk").write_text("FOO.XYZ:\n")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exc_info:
+        BuildEnv()
+    assert exc_info.value.code == 1
+    assert not list(tmp_path.rglob(".Rules.mk.build"))